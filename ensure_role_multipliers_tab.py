@@ -13,7 +13,8 @@ Env vars:
   GSHEET_RETRY_ATTEMPTS (default: 6)
   GSHEET_RETRY_BASE (default: 2.0)
 """
-import os, sys, json, time, random, pandas as pd
+import os, sys, json, functools, pandas as pd
+from src.gsheets import with_retries
 
 SHEET_ID = os.getenv("SHEET_ID", "").strip()
 TAB = os.getenv("SHEET_TAB_ROLE_MULT", "role_multipliers").strip()
@@ -25,6 +26,7 @@ if not SHEET_ID:
 if not os.path.exists(TEMPLATE_PATH):
     print(f"ERROR: template not found at {TEMPLATE_PATH}", file=sys.stderr); sys.exit(2)
 
+@functools.lru_cache(maxsize=1)
 def _get_creds(scopes):
     from google.oauth2.service_account import Credentials
     cred_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
@@ -35,65 +37,40 @@ def _get_creds(scopes):
         raise RuntimeError("GOOGLE_SERVICE_ACCOUNT_JSON is empty")
     return Credentials.from_service_account_info(json.loads(raw), scopes=scopes)
 
-RETRY_CODES = {429, 500, 502, 503, 504}
-def _should_retry_apierror(e):
-    try:
-        from gspread import exceptions as gex
-        if isinstance(e, gex.APIError):
-            resp = getattr(e, "response", None)
-            if resp is not None:
-                code = getattr(resp, "status_code", None)
-                if code in RETRY_CODES: return True, code
-            msg = " ".join(str(x) for x in e.args)
-            for c in RETRY_CODES:
-                if str(c) in msg: return True, c
-            return True, None
-    except Exception:
-        pass
-    return False, None
-
-def with_retries(fn, *args, **kwargs):
-    attempts = int(os.getenv("GSHEET_RETRY_ATTEMPTS","6"))
-    base = float(os.getenv("GSHEET_RETRY_BASE","2.0"))
-    for i in range(1, attempts+1):
-        try:
-            return fn(*args, **kwargs)
-        except Exception as e:
-            do_retry, code = _should_retry_apierror(e)
-            if not do_retry:
-                raise
-            sleep_s = base ** min(i, 6) + random.uniform(0, 0.5*base)
-            print(f"[retry {i}/{attempts}] transient Google API error ({code}); sleeping {sleep_s:.1f}s...", file=sys.stderr)
-            time.sleep(sleep_s)
-    return fn(*args, **kwargs)
+@functools.lru_cache(maxsize=1)
+def _client():
+    import gspread
+    return gspread.authorize(_get_creds(("https://www.googleapis.com/auth/spreadsheets",)))
 
 def _open_sheet():
-    import gspread
-    creds = _get_creds(["https://www.googleapis.com/auth/spreadsheets"])
-    return with_retries(lambda: gspread.authorize(creds).open_by_key(SHEET_ID))
+    return with_retries(lambda: _client().open_by_key(SHEET_ID))
+
+def _values(df: pd.DataFrame):
+    return [df.columns.tolist()] + df.astype(object).where(df.notna(), "").values.tolist()
 
 def upsert(df: pd.DataFrame, title: str):
-    from gspread_dataframe import set_with_dataframe
     sh = _open_sheet()
+    rows = _values(df)
     try:
         ws = with_retries(sh.worksheet, title)
         if FORCE:
-            with_retries(ws.clear)
-            with_retries(set_with_dataframe, ws, df, include_index=False, include_column_header=True, resize=True)
+            with_retries(ws.resize, rows=len(rows), cols=len(df.columns))
+            with_retries(ws.update, values=rows, range_name="A1", value_input_option="RAW")
             print(f"Refreshed tab: {title} ({len(df)} rows)")
         else:
             print(f"Tab '{title}' already exists; set FORCE_ROLE_MULTIPLIERS=1 to overwrite. (No changes)")
     except Exception:
-        rows = str(max(200, len(df)+50)); cols = str(max(20, len(df.columns)+5))
-        ws = with_retries(sh.add_worksheet, title=title, rows=rows, cols=cols)
-        with_retries(set_with_dataframe, ws, df, include_index=False, include_column_header=True, resize=True)
+        ws = with_retries(sh.add_worksheet, title=title, rows=len(rows), cols=len(df.columns))
+        with_retries(ws.update, values=rows, range_name="A1", value_input_option="RAW")
         print(f"Created tab: {title} ({len(df)} rows)")
 
-df = pd.read_csv(TEMPLATE_PATH)
-need = ["role_type","role_name","points","rebounds","assists","threes","steals","ftm"]
-missing = [c for c in need if c not in df.columns]
+MULT_DTYPES = {"role_type":"string","role_name":"string","points":"float64","rebounds":"float64",
+               "assists":"float64","threes":"float64","steals":"float64","ftm":"float64"}
+need = list(MULT_DTYPES)
+missing = [c for c in need if c not in pd.read_csv(TEMPLATE_PATH, nrows=0).columns]
 if missing:
     print(f"ERROR: template missing columns: {missing}", file=sys.stderr); sys.exit(3)
+df = pd.read_csv(TEMPLATE_PATH, usecols=need, dtype=MULT_DTYPES)
 
 upsert(df, TAB)
 print("Done ensure_role_multipliers_tab (with retries)")
@@ -1,18 +1,25 @@
 #!/usr/bin/env python3
-import os, sys, json, pandas as pd
+import os, sys, json, functools, pandas as pd
+import gspread
+from google.oauth2.service_account import Credentials
+from src.gsheets import with_retries
 SHEET_ID=os.getenv("SHEET_ID","").strip(); TAB=os.getenv("SHEET_TAB_ROLES","player_roles_today").strip(); OUT=os.getenv("OUTPUT_DIR","./out").strip()
 CSV=os.path.join(OUT,"player_roles_today.csv")
 if not SHEET_ID or not os.path.exists(CSV): print("ERR: missing SHEET_ID or roles CSV", file=sys.stderr); sys.exit(1)
+@functools.lru_cache(maxsize=1)
 def _get_creds(scopes):
-    from google.oauth2.service_account import Credentials
     cred_path=os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
     if cred_path and os.path.exists(cred_path): return Credentials.from_service_account_file(cred_path, scopes=scopes)
     return Credentials.from_service_account_info(json.loads(os.getenv("GOOGLE_SERVICE_ACCOUNT_JSON","")), scopes=scopes)
-def _open(): import gspread; return gspread.authorize(_get_creds(["https://www.googleapis.com/auth/spreadsheets"])).open_by_key(SHEET_ID)
+@functools.lru_cache(maxsize=1)
+def _open(): return with_retries(gspread.authorize(_get_creds(("https://www.googleapis.com/auth/spreadsheets",))).open_by_key, SHEET_ID)
 def upsert(df,title):
-    from gspread_dataframe import set_with_dataframe
-    sh=_open(); 
-    try: ws=sh.worksheet(title); ws.clear()
-    except Exception: ws=sh.add_worksheet(title=title, rows=str(max(200,len(df)+50)), cols=str(max(20,len(df.columns)+5)))
-    set_with_dataframe(ws, df, include_index=False, include_column_header=True, resize=True)
-df=pd.read_csv(CSV); upsert(df, TAB); print("Pushed roles:", len(df))
+    sh=_open(); vals=[df.columns.tolist()] + df.astype(object).where(df.notna(), "").to_numpy().tolist()
+    try: ws=with_retries(sh.worksheet, title)
+    except Exception: ws=with_retries(sh.add_worksheet, title=title, rows=len(vals), cols=len(df.columns))
+    if (ws.row_count, ws.col_count)!=(len(vals), len(df.columns)): with_retries(ws.resize, rows=len(vals), cols=len(df.columns))
+    with_retries(ws.update, values=vals, range_name="A1", value_input_option="RAW")
+def read_csv_fast(path):
+    try: return pd.read_csv(path, engine="pyarrow")
+    except Exception: return pd.read_csv(path)
+df=read_csv_fast(CSV); upsert(df, TAB); print("Pushed roles:", len(df))
@@ -1,23 +1,49 @@
 #!/usr/bin/env python3
-import os, sys, json, pandas as pd
+import os, sys, json, functools, hashlib, pandas as pd
+import gspread
+from google.oauth2.service_account import Credentials
+from src.gsheets import with_retries
 SHEET_ID = os.getenv("SHEET_ID","").strip()
 GOOGLE_SERVICE_ACCOUNT_JSON = os.getenv("GOOGLE_SERVICE_ACCOUNT_JSON","").strip()
 OUT = os.getenv("OUTPUT_DIR","./out").strip()
 TAB = os.getenv("SHEET_TAB_PROJECTIONS","player_prop_projections").strip()
 CSV = os.path.join(OUT, "player_prop_projections.csv")
+META_TAB = os.getenv("SHEET_TAB_PUSH_META","_push_meta").strip()
+FORCE = os.getenv("FORCE_PUSH","0").strip() == "1"
 if not SHEET_ID or not os.path.exists(CSV): print("ERR: missing SHEET_ID or projections CSV", file=sys.stderr); sys.exit(1)
 
+@functools.lru_cache(maxsize=1)
 def _get_creds(scopes):
-    from google.oauth2.service_account import Credentials
     cred_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
     if cred_path and os.path.exists(cred_path):
         return Credentials.from_service_account_file(cred_path, scopes=scopes)
     return Credentials.from_service_account_info(json.loads(GOOGLE_SERVICE_ACCOUNT_JSON), scopes=scopes)
-def _open(): import gspread; return gspread.authorize(_get_creds(["https://www.googleapis.com/auth/spreadsheets"])).open_by_key(SHEET_ID)
-def upsert(df, title):
-    from gspread_dataframe import set_with_dataframe
+
+@functools.lru_cache(maxsize=1)
+def _open(): return with_retries(gspread.authorize(_get_creds(("https://www.googleapis.com/auth/spreadsheets",))).open_by_key, SHEET_ID)
+def upsert(path, title, chunksize=int(os.getenv("PUSH_CHUNK_ROWS","5000"))):
+    sh=_open(); head=pd.read_csv(path, nrows=0).columns.tolist(); n=0
+    total=sum(len(c) for c in pd.read_csv(path, usecols=[0], chunksize=chunksize)) if head else 0
+    try: ws=with_retries(sh.worksheet, title)
+    except Exception: ws=with_retries(sh.add_worksheet, title=title, rows=total+1, cols=max(len(head),1))
+    with_retries(ws.resize, rows=total+1, cols=max(len(head),1))
+    with_retries(ws.update, values=[head], range_name="A1", value_input_option="RAW")
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        if not len(chunk): continue
+        with_retries(ws.update, values=chunk.astype(object).where(chunk.notna(), "").to_numpy().tolist(), range_name=f"A{n+2}", value_input_option="RAW"); n+=len(chunk)
+    return n
+def _digest(path):
+    h=hashlib.blake2b(digest_size=16)
+    with open(path,"rb") as f:
+        for b in iter(lambda: f.read(1<<20), b""): h.update(b)
+    return h.hexdigest()
+def _meta():
     sh=_open()
-    try: ws=sh.worksheet(title); ws.clear()
-    except Exception: ws=sh.add_worksheet(title=title, rows=str(max(200,len(df)+50)), cols=str(max(20,len(df.columns)+5)))
-    set_with_dataframe(ws, df, include_index=False, include_column_header=True, resize=True)
-df=pd.read_csv(CSV); upsert(df, TAB); print("Pushed", len(df), "rows to", TAB)
+    try: ws=with_retries(sh.worksheet, META_TAB)
+    except Exception: ws=with_retries(sh.add_worksheet, title=META_TAB, rows=20, cols=2)
+    return ws, with_retries(ws.get_all_values)
+digest=_digest(CSV); meta, rows=_meta(); i=next((i for i,r in enumerate(rows) if r and r[0]==TAB), len(rows))
+if not FORCE and i<len(rows) and rows[i][1:2]==[digest] and TAB in [w.title for w in with_retries(_open().worksheets)]:
+    print("Projections CSV unchanged; skipped push to", TAB); sys.exit(0)
+n=upsert(CSV, TAB); with_retries(meta.update, values=[[TAB, digest]], range_name=f"A{i+1}", value_input_option="RAW")
+print("Pushed", n, "rows to", TAB)
@@ -1,13 +1,44 @@
 # scripts/fit_roles.py
-import os, pandas as pd, numpy as np, joblib
-from src.roles.features import build_rolling_features
+import os, glob, json, hashlib, pandas as pd, numpy as np, joblib
+from src.roles.features import build_rolling_features, sheet_modified_time
 from src.roles.cluster_off import fit_offensive_roles, OFF_FEATURES
-from src.roles.cluster_def import fit_defensive_roles, DEF_FEATURES
+from src.roles.cluster_def import fit_defensive_roles, defensive_cache_key, DEF_FEATURES
 SHEET_ID=os.getenv("SHEET_ID","").strip(); OUT=os.getenv("OUTPUT_DIR","./out").strip()
 if not SHEET_ID: raise SystemExit("SHEET_ID missing")
 os.makedirs(OUT, exist_ok=True); MODEL_DIR=os.path.join(OUT,"models","roles"); os.makedirs(MODEL_DIR, exist_ok=True)
-f10,f20 = build_rolling_features(SHEET_ID, tab_logs=os.getenv("TAB_LOGS","player_game_log"), win_short=10, win_long=20)
+TAB_LOGS=os.getenv("TAB_LOGS","player_game_log"); WINS=(10,20); FEATURES_VERSION=1
+USE_CACHE = os.getenv("ROLES_CACHE","1").strip()!="0"; stamp = sheet_modified_time(SHEET_ID) if USE_CACHE else None
+key = hashlib.blake2b(json.dumps([FEATURES_VERSION,SHEET_ID,TAB_LOGS,*WINS,stamp]).encode(), digest_size=8).hexdigest()
+CACHE=os.path.join(OUT,".cache"); paths=[os.path.join(CACHE,f"features_{key}_{w}.parquet") for w in WINS]
+def _load_features():
+    if stamp and all(os.path.exists(p) for p in paths):
+        try: return tuple(pd.read_parquet(p) for p in paths)
+        except Exception: pass
+    feats = build_rolling_features(SHEET_ID, tab_logs=TAB_LOGS, win_short=WINS[0], win_long=WINS[1])
+    if stamp:
+        try:
+            os.makedirs(CACHE, exist_ok=True)
+            for f,p in zip(feats, paths): f.to_parquet(p+".tmp", index=False); os.replace(p+".tmp", p)
+            for old in glob.glob(os.path.join(CACHE, "features_*.parquet")):
+                if old not in paths: os.remove(old)
+        except Exception: pass
+    return feats
+def _fit_defense(n_components, bic_select):
+    if not USE_CACHE: return fit_defensive_roles(f20, n_components=n_components, bic_select=bic_select)
+    path = os.path.join(CACHE, f"gmm_def_{defensive_cache_key(f20, n_components, bic_select=bic_select)}.joblib")
+    try: return joblib.load(path)
+    except Exception: pass
+    deff = fit_defensive_roles(f20, n_components=n_components, bic_select=bic_select)
+    try:
+        os.makedirs(CACHE, exist_ok=True); joblib.dump(deff, path+".tmp"); os.replace(path+".tmp", path)
+        for old in glob.glob(os.path.join(CACHE, "gmm_def_*.joblib")):
+            if old != path: os.remove(old)
+    except Exception: pass
+    return deff
+f10,f20 = _load_features()
 if f20.empty: raise SystemExit("Need more player_game_log data")
-off = fit_offensive_roles(f20, n_components=int(os.getenv("OFF_K","5"))); joblib.dump(off, os.path.join(MODEL_DIR,"offense.pkl"))
-deff= fit_defensive_roles(f20, n_components=int(os.getenv("DEF_K","4"))); joblib.dump(deff, os.path.join(MODEL_DIR,"defense.pkl"))
+try: prior = joblib.load(os.path.join(MODEL_DIR,"offense.pkl"))
+except Exception: prior = None
+off = fit_offensive_roles(f20, n_components=int(os.getenv("OFF_K","5")), prior=prior); joblib.dump(off, os.path.join(MODEL_DIR,"offense.pkl"), compress=3)
+deff= _fit_defense(int(os.getenv("DEF_K","4")), os.getenv("GMM_BIC_SELECT","0").strip()=="1"); joblib.dump(deff, os.path.join(MODEL_DIR,"defense.pkl"), compress=3)
 f20.to_csv(os.path.join(MODEL_DIR,"training_features_long.csv"), index=False); print("Saved role models")
@@ -1,68 +1,179 @@
 #!/usr/bin/env python3
-import os, sys, json, pandas as pd, numpy as np
+import os, sys, json, functools, hashlib, pandas as pd, numpy as np
+try: from orjson import loads as _loads
+except ImportError: _loads = json.loads
 
 SHEET_ID = os.getenv("SHEET_ID", "").strip()
 GOOGLE_SERVICE_ACCOUNT_JSON = os.getenv("GOOGLE_SERVICE_ACCOUNT_JSON", "").strip()
 OUT = os.getenv("OUTPUT_DIR", "./out")
+EXPORT_CSV = os.getenv("EXPORT_CSV", "1").strip() != "0"
+EXPORT_PARQUET = os.getenv("EXPORT_PARQUET", "0").strip() == "1"
 os.makedirs(OUT, exist_ok=True)
 
-def _get_creds(scopes):
-    from google.oauth2.service_account import Credentials
+TOKEN_CACHE = os.getenv("GCP_TOKEN_CACHE", "").strip() or os.path.join(os.getenv("XDG_CACHE_HOME", "").strip() or os.path.expanduser("~/.cache"), "wnba-prop-cheater", "gcp_token.json")
+
+def _service_account_info():
     cred_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
     if cred_path and os.path.exists(cred_path):
-        return Credentials.from_service_account_file(cred_path, scopes=scopes)
+        with open(cred_path, "rb") as f: return _loads(f.read())
     if GOOGLE_SERVICE_ACCOUNT_JSON:
-        return Credentials.from_service_account_info(json.loads(GOOGLE_SERVICE_ACCOUNT_JSON), scopes=scopes)
+        return _loads(GOOGLE_SERVICE_ACCOUNT_JSON)
     raise RuntimeError("Missing GOOGLE_SERVICE_ACCOUNT_JSON or GOOGLE_APPLICATION_CREDENTIALS")
 
-def _read_tab(tab):
+@functools.lru_cache(maxsize=1)
+def _get_creds(scopes):
+    import datetime as dt
+    info = _service_account_info(); key = [info.get("client_email"), list(scopes)]
+    now = dt.datetime.now(dt.timezone.utc).replace(tzinfo=None)
+    try:
+        with open(TOKEN_CACHE) as f: c = json.load(f)
+        exp = dt.datetime.fromisoformat(c["expiry"])
+        if c["key"] == key and (exp - now).total_seconds() > 60:
+            from google.oauth2.credentials import Credentials
+            return Credentials(token=c["token"], expiry=exp, scopes=list(scopes))
+    except Exception: pass
+    from google.oauth2.service_account import Credentials
+    sa = Credentials.from_service_account_info(info, scopes=scopes)
+    try:
+        from google.auth.transport.requests import Request
+        sa.refresh(Request()); os.makedirs(os.path.dirname(TOKEN_CACHE), mode=0o700, exist_ok=True); tmp = TOKEN_CACHE + ".tmp"
+        with os.fdopen(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as f:
+            json.dump({"key": key, "token": sa.token, "expiry": sa.expiry.isoformat()}, f)
+        os.chmod(tmp, 0o600); os.replace(tmp, TOKEN_CACHE)
+    except Exception: pass
+    return sa
+
+@functools.lru_cache(maxsize=1)
+def _sheet():
     import gspread
-    from gspread_dataframe import get_as_dataframe
-    creds = _get_creds(["https://www.googleapis.com/auth/spreadsheets.readonly"])
-    gc = gspread.authorize(creds)
-    sh = gc.open_by_key(SHEET_ID)
-    ws = sh.worksheet(tab)
-    df = get_as_dataframe(ws, evaluate_formulas=True, header=0)
-    return df.dropna(how="all")
-
-def _optional_tab(tab):
-    try: return _read_tab(tab)
-    except Exception: return None
+    gc = gspread.authorize(_get_creds(("https://www.googleapis.com/auth/spreadsheets.readonly",)))
+    return gc.open_by_key(SHEET_ID)
+
+def _frame(vals):
+    from pandas.io.parsers import TextParser
+    if not vals: return pd.DataFrame()
+    n = max(map(len, vals))
+    df = TextParser([list(r)+[""]*(n-len(r)) for r in vals], header=0).read().dropna(how="all")
+    empty = df.columns.astype(str).str.match(r"^Unnamed: \d+$") & df.isna().all().to_numpy()
+    return df.loc[:, ~empty]
+
+def _array(col):
+    import pyarrow as pa
+    try: return pa.array(col)
+    except (pa.ArrowInvalid, pa.ArrowTypeError): return pa.array([None if v is None else str(v) for v in col])
+
+def _table(vals):
+    if len(vals) <= 1: return None
+    try:
+        import pyarrow as pa
+        n = max(map(len, vals)); head, seen = [], {}
+        for i, c in enumerate(list(vals[0]) + [""]*(n-len(vals[0]))):
+            c = str(c) if c != "" else f"Unnamed: {i}"; k = seen.get(c, 0); seen[c] = k + 1
+            head.append(f"{c}.{k}" if k else c)
+        rows = [r for r in vals[1:] if any(v != "" for v in r)]
+        cols = [[r[i] if i < len(r) and r[i] != "" else None for r in rows] for i in range(n)]
+        keep = [i for i in range(n) if not (head[i] == f"Unnamed: {i}" and all(v is None for v in cols[i]))]
+        return pa.Table.from_arrays([_array(cols[i]) for i in keep], names=[head[i] for i in keep])
+    except Exception:
+        return _frame(vals)
+
+def _read_tabs(tabs, raw=()):
+    from gspread.utils import absolute_range_name
+    sh = _sheet(); have = {ws.title for ws in sh.worksheets()}
+    tabs = [t for t in tabs if t in have]
+    if not tabs: return {}
+    res = sh.values_batch_get([absolute_range_name(t) for t in tabs], params={"valueRenderOption":"UNFORMATTED_VALUE","dateTimeRenderOption":"FORMATTED_STRING"})
+    return {t: (_table if t in raw else _frame)(vr.get("values", [])) for t, vr in zip(tabs, res.get("valueRanges", []))}
+
+def _csv_bytes(df):
+    try:
+        import pyarrow as pa, pyarrow.csv as pacsv
+        buf = pa.BufferOutputStream(); tbl = df if isinstance(df, pa.Table) else pa.Table.from_pandas(df, preserve_index=False)
+        pacsv.write_csv(tbl, buf, write_options=pacsv.WriteOptions(include_header=True))
+        return buf.getvalue().to_pybytes()
+    except Exception:
+        return df.reset_index(drop=True).to_csv(index=False).encode("utf-8")
+
+def _sha_path(path):
+    return os.path.join(OUT, ".cache", "exports", os.path.basename(path) + ".sha")
+
+def _unchanged(path, h):
+    try:
+        with open(_sha_path(path)) as f: return f.read().strip() == h and os.path.exists(path)
+    except OSError: return False
+
+def _mark(path, h):
+    sha = _sha_path(path); os.makedirs(os.path.dirname(sha), exist_ok=True)
+    with open(sha + ".tmp", "w") as f: f.write(h)
+    os.replace(sha + ".tmp", sha)
+
+def _drop(path):
+    for f in (path, _sha_path(path)):
+        if os.path.exists(f): os.remove(f)
+
+def _write_csv(df, path):
+    data = _csv_bytes(df); h = hashlib.blake2b(data, digest_size=16).hexdigest()
+    if _unchanged(path, h): return
+    with open(path, "wb") as f: f.write(data)
+    _mark(path, h)
+
+def _write_parquet(df, path):
+    try:
+        import pyarrow as pa, pyarrow.parquet as pq
+        buf = pa.BufferOutputStream()
+        pq.write_table(df if isinstance(df, pa.Table) else pa.Table.from_pandas(df, preserve_index=False), buf, compression="zstd", compression_level=1)
+        data = buf.getvalue().to_pybytes()
+    except Exception:
+        _drop(path); return False
+    h = hashlib.blake2b(data, digest_size=16).hexdigest()
+    if not _unchanged(path, h):
+        with open(path, "wb") as f: f.write(data)
+        _mark(path, h)
+    return True
+
+def _export(df, fname):
+    path = os.path.join(OUT, fname); pq_path = os.path.splitext(path)[0] + ".parquet"
+    wrote = _write_parquet(df, pq_path) if EXPORT_PARQUET else (_drop(pq_path) or False)
+    if EXPORT_CSV or not wrote: _write_csv(df, path)
+    else: _drop(path)
 
 if not SHEET_ID: print("ERROR: SHEET_ID missing", file=sys.stderr); sys.exit(1)
 
-lines = _read_tab("lines")
-opp   = _read_tab("opponent_per100_last6")
-pace  = _read_tab("pace_last6")
+REQUIRED = ["lines", "opponent_per100_last6", "pace_last6"]
+OPTIONAL = [
+    ("four_factors_last6", "four_factors_all_last6.csv"),
+    ("archetypes", "archetypes.csv"),
+    ("players_baseline", "players_baseline.csv"),
+    ("on_off", "on_off.csv"),
+    ("status_rest", "status_rest.csv"),
+    ("positional_defense", "positional_defense.csv"),
+]
+frames = _read_tabs(REQUIRED + [t for t, _ in OPTIONAL], raw={t for t, _ in OPTIONAL})
+missing = [t for t in REQUIRED if t not in frames]
+if missing: print("ERROR: sheet missing tabs:", missing, file=sys.stderr); sys.exit(2)
+lines, opp, pace = (frames[t] for t in REQUIRED)
 
-lines.columns = [str(c).strip().lower() for c in lines.columns]
+lines.columns = lines.columns.astype(str).str.strip().str.lower()
 need = {"player","team","opponent","prop","line"}
 if not need.issubset(set(lines.columns)):
     print("ERROR: 'lines' missing columns:", sorted(list(need-set(lines.columns))), file=sys.stderr); sys.exit(2)
 
-opp.columns = [str(c).strip() for c in opp.columns]
+opp.columns = opp.columns.astype(str).str.strip()
 if "TEAM_NAME" not in opp.columns:
     if "Team" in opp.columns: opp.rename(columns={"Team":"TEAM_NAME"}, inplace=True)
     else: print("ERROR: 'opponent_per100_last6' must include TEAM_NAME", file=sys.stderr); sys.exit(2)
 
-pace.columns = [str(c).strip().upper() for c in pace.columns]
+pace.columns = pace.columns.astype(str).str.strip().str.upper()
 if not {"TEAM_NAME","PACE"}.issubset(set(pace.columns)):
     print("ERROR: 'pace_last6' must include TEAM_NAME and PACE", file=sys.stderr); sys.exit(2)
 
-lines.to_csv(os.path.join(OUT, "lines_sheet.csv"), index=False)
-opp.to_csv(os.path.join(OUT, "opponent_general_per100_last6.csv"), index=False)
-pace[["TEAM_NAME","PACE"]].to_csv(os.path.join(OUT, "pace_last6.csv"), index=False)
+_export(lines, "lines_sheet.csv")
+_export(opp, "opponent_general_per100_last6.csv")
+_export(pace[["TEAM_NAME","PACE"]], "pace_last6.csv")
 
-for tab, fname in [
-    ("four_factors_last6", "four_factors_all_last6.csv"),
-    ("archetypes", "archetypes.csv"),
-    ("players_baseline", "players_baseline.csv"),
-    ("on_off", "on_off.csv"),
-    ("status_rest", "status_rest.csv"),
-    ("positional_defense", "positional_defense.csv"),
-]:
-    df = _optional_tab(tab)
-    if df is not None and not df.dropna(how="all").empty:
-        df.to_csv(os.path.join(OUT, fname), index=False)
+for tab, fname in OPTIONAL:
+    df = frames.get(tab)
+    if df is not None and len(df):
+        _export(df, fname)
 
 print("Sheets-only runner completed. Context exported to ./out")
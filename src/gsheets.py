@@ -0,0 +1,31 @@
+# src/gsheets.py
+import os, sys, time, random
+RETRY_CODES = {429, 500, 502, 503, 504}
+def should_retry(e):
+    try: from gspread import exceptions as gex
+    except Exception: return False, None
+    if not isinstance(e, gex.APIError): return False, None
+    resp = getattr(e, "response", None)
+    code = getattr(resp, "status_code", None) if resp is not None else None
+    if code is None: code = getattr(e, "code", None)
+    return code in RETRY_CODES, code
+def retry_after(e):
+    try: return max(0.0, float(e.response.headers["Retry-After"]))
+    except Exception: return None
+def with_retries(fn, *args, **kwargs):
+    attempts = int(os.getenv("GSHEET_RETRY_ATTEMPTS","6"))
+    base = float(os.getenv("GSHEET_RETRY_BASE","2.0"))
+    max_delay = float(os.getenv("GSHEET_RETRY_MAX_DELAY","30"))
+    for i in range(1, attempts+1):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            do_retry, code = should_retry(e)
+            if not do_retry:
+                raise
+            sleep_s = retry_after(e)
+            if sleep_s is None: sleep_s = base ** min(i, 6) + random.uniform(0, 0.5*base)
+            sleep_s = min(max_delay, sleep_s)
+            print(f"[retry {i}/{attempts}] transient Google API error ({code}); sleeping {sleep_s:.1f}s...", file=sys.stderr)
+            time.sleep(sleep_s)
+    return fn(*args, **kwargs)
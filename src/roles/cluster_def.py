@@ -3,14 +3,23 @@ import numpy as np, pandas as pd
 from sklearn.preprocessing import StandardScaler
 from sklearn.mixture import GaussianMixture
 DEF_FEATURES = ["reb40","stl40","blk40"]
-def fit_defensive_roles(df: pd.DataFrame, n_components=4, random_state=42):
-    df=df.copy()
-    for c in DEF_FEATURES:
-        if c not in df.columns: df[c]=0.0
-        df[c]=df[c].replace([np.inf,-np.inf],np.nan).fillna(0.0)
-    X=df[DEF_FEATURES].values; scaler=StandardScaler(); Xs=scaler.fit_transform(X)
-    k=min(n_components, max(2, len(df)//8)); gmm=GaussianMixture(n_components=k, covariance_type="diag", random_state=random_state).fit(Xs)
-    return {"scaler":scaler,"model":gmm,"features":DEF_FEATURES}
+def _design(df):
+    return np.column_stack([df[c].replace([np.inf,-np.inf],np.nan).fillna(0.0).to_numpy(dtype=np.float32) if c in df.columns else np.zeros(len(df),dtype=np.float32) for c in DEF_FEATURES])
+def _gmm_kw(n_rows, n_components, random_state):
+    k=min(n_components, max(2, n_rows//8))
+    return dict(n_components=k, covariance_type="spherical", init_params="k-means++", n_init=1, max_iter=50, tol=1e-3, reg_covar=1e-4, random_state=random_state)
+def defensive_cache_key(df: pd.DataFrame, n_components=4, random_state=42, bic_select=False):
+    import hashlib, sklearn
+    X=_design(df); kw=_gmm_kw(len(df), n_components, random_state)
+    h=hashlib.blake2b(X.tobytes(), digest_size=16); h.update(repr((X.shape, DEF_FEATURES, sorted(kw.items()), bic_select, sklearn.__version__)).encode())
+    return h.hexdigest()
+def fit_defensive_roles(df: pd.DataFrame, n_components=4, random_state=42, bic_select=False):
+    X=_design(df); kw=_gmm_kw(len(df), n_components, random_state); k=kw["n_components"]
+    scaler=StandardScaler(); Xs=scaler.fit_transform(X).astype(np.float32, copy=False)
+    ks=[kk for kk in sorted({max(2,k-1),k,k+1}) if kk<=max(2, len(Xs)//8)] if bic_select else [k]
+    gmm=min((GaussianMixture(**dict(kw, n_components=kk)).fit(Xs) for kk in ks), key=lambda g: g.bic(Xs))
+    return {"scaler":scaler,"model":gmm,"features":DEF_FEATURES,"mu":scaler.mean_.astype(np.float32),"inv_scale":(1.0/scaler.scale_).astype(np.float32)}
 def predict_defensive_roles(bundle, df):
-    X=df[bundle["features"]].replace([np.inf,-np.inf],np.nan).fillna(0.0).values
-    Xs=bundle["scaler"].transform(X); probs=bundle["model"].predict_proba(Xs); labs=bundle["model"].predict(Xs); return probs,labs
+    X=df[bundle["features"]].replace([np.inf,-np.inf],np.nan).fillna(0.0).to_numpy(dtype=np.float32)
+    Xs=np.multiply(np.subtract(X, bundle["mu"]), bundle["inv_scale"]) if "mu" in bundle else bundle["scaler"].transform(X); probs=bundle["model"].predict_proba(Xs)
+    return probs, probs.argmax(axis=1)
@@ -1,47 +1,83 @@
 # src/roles/features.py
-import os, json, pandas as pd, numpy as np
+import os, json, functools, pandas as pd, numpy as np
+@functools.lru_cache(maxsize=1)
 def _get_creds():
     from google.oauth2.service_account import Credentials
     cred_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
     js = os.getenv("GOOGLE_SERVICE_ACCOUNT_JSON","").strip()
-    scopes=["https://www.googleapis.com/auth/spreadsheets.readonly"]
+    scopes=["https://www.googleapis.com/auth/spreadsheets.readonly","https://www.googleapis.com/auth/drive.metadata.readonly"]
     if cred_path and os.path.exists(cred_path): return Credentials.from_service_account_file(cred_path, scopes=scopes)
     if js: return Credentials.from_service_account_info(json.loads(js), scopes=scopes)
     raise RuntimeError("Missing creds")
+def _cache_paths(sheet_id, tab):
+    d = os.path.join(os.getenv("OUTPUT_DIR","./out").strip(), ".cache"); os.makedirs(d, exist_ok=True)
+    stem = os.path.join(d, f"{sheet_id}_{tab}"); return stem+".parquet", stem+".meta.json"
+def _frame(vals):
+    if not vals: return pd.DataFrame()
+    head = [str(c) if c!="" else f"Unnamed: {i}" for i,c in enumerate(vals[0])]; n = len(head)
+    df = pd.DataFrame([(list(r)+[""]*n)[:n] for r in vals[1:]], columns=head)
+    return df.replace("", np.nan).dropna(how="all")
+@functools.lru_cache(maxsize=1)
+def _client():
+    import gspread; return gspread.authorize(_get_creds())
+@functools.lru_cache(maxsize=None)
+def _open(sheet_id):
+    return _client().open_by_key(sheet_id)
+def sheet_modified_time(sheet_id):
+    try: return _open(sheet_id).get_lastUpdateTime()
+    except Exception: return None
 def _read_sheet(sheet_id, tab):
-    import gspread; from gspread_dataframe import get_as_dataframe
-    gc = gspread.authorize(_get_creds()); sh = gc.open_by_key(sheet_id)
-    df = get_as_dataframe(sh.worksheet(tab), evaluate_formulas=True, header=0)
-    return df.dropna(how="all")
+    from gspread.utils import absolute_range_name
+    sh = _open(sheet_id); stamp = None
+    if os.getenv("ROLES_CACHE","1").strip()!="0":
+        pq, meta = _cache_paths(sheet_id, tab); stamp = sheet_modified_time(sheet_id)
+        if stamp and os.path.exists(pq) and os.path.exists(meta):
+            try:
+                with open(meta) as f:
+                    if json.load(f).get("modifiedTime")==stamp: return pd.read_parquet(pq)
+            except Exception: pass
+    vals = sh.values_get(absolute_range_name(tab), params={"valueRenderOption":"UNFORMATTED_VALUE","dateTimeRenderOption":"FORMATTED_STRING"}).get("values", [])
+    df = _frame(vals)
+    if stamp:
+        try:
+            df.to_parquet(pq+".tmp", index=False); os.replace(pq+".tmp", pq)
+            with open(meta+".tmp","w") as f: json.dump({"modifiedTime": stamp}, f)
+            os.replace(meta+".tmp", meta)
+        except Exception: pass
+    return df
 def _num(df, cols):
     for c in cols:
         if c in df.columns: df[c] = pd.to_numeric(df[c], errors="coerce")
     return df
 def build_rolling_features(sheet_id: str, tab_logs="player_game_log", win_short=10, win_long=20):
-    logs = _read_sheet(sheet_id, tab_logs); logs.columns = [str(c).strip().lower() for c in logs.columns]
+    logs = _read_sheet(sheet_id, tab_logs); logs.columns = logs.columns.astype(str).str.strip().str.lower()
     req = ["date","player","team","min","pts","reb","ast","stl","blk","tov","fga","fg3a","fta"]
     miss = [c for c in req if c not in logs.columns]
     if miss: raise ValueError(f"'player_game_log' missing columns: {miss}")
     logs["date"] = pd.to_datetime(logs["date"], errors="coerce"); logs = logs.dropna(subset=["date","player","team","min"])
+    logs["player"] = logs["player"].astype("category"); logs["team"] = logs["team"].astype("category")
     logs = _num(logs, ["min","pts","reb","ast","stl","blk","tov","fga","fg3a","fta"]).sort_values(["player","date"])
     def per40(df):
-        m = df["min"].replace(0, np.nan)
-        return pd.DataFrame({
-            "pts40": (df["pts"]/m)*40, "reb40": (df["reb"]/m)*40, "ast40": (df["ast"]/m)*40,
-            "stl40": (df["stl"]/m)*40, "blk40": (df["blk"]/m)*40, "tov40": (df["tov"]/m)*40,
-            "fga40": (df["fga"]/m)*40, "fg3a40": (df["fg3a"]/m)*40, "fta40": (df["fta"]/m)*40,
-            "three_rate": df["fg3a"]/(df["fga"].replace(0,np.nan)), "ft_rate": df["fta"]/(df["fga"].replace(0,np.nan)), "min": df["min"],
-        })
-    def roll(df, w):
-        x = per40(df); r = x.rolling(w, min_periods=max(5,w//2)).mean(); r["player"]=df["player"].values; r["team"]=df["team"].values; r["date"]=df["date"].values; return r
-    def last(df, w):
-        parts=[]; 
-        for p,g in df.groupby("player", sort=False):
-            r=roll(g,w).dropna(subset=["pts40","reb40","ast40"])
-            if not r.empty: parts.append(r.iloc[-1])
-        if not parts: return pd.DataFrame()
-        out=pd.DataFrame(parts).replace([np.inf,-np.inf],np.nan).fillna(0)
+        m = df["min"].to_numpy(dtype=float); fga = df["fga"].to_numpy(dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out = {f"{c}40": np.where(m!=0, (df[c].to_numpy(dtype=float)/m)*40, np.nan) for c in ["pts","reb","ast","stl","blk","tov","fga","fg3a","fta"]}
+            out["three_rate"] = np.where(fga!=0, df["fg3a"].to_numpy(dtype=float)/fga, np.nan); out["ft_rate"] = np.where(fga!=0, df["fta"].to_numpy(dtype=float)/fga, np.nan)
+        out["min"] = m; return pd.DataFrame(out)
+    feat = per40(logs); cols = list(feat.columns); X = feat.to_numpy(dtype=float)
+    codes = logs["player"].cat.codes.to_numpy(); first = np.r_[0, np.flatnonzero(np.diff(codes))+1][codes]
+    ok = np.isfinite(X); z = np.zeros((1, X.shape[1]))
+    cs = np.vstack([z, np.where(ok, X, 0.0).cumsum(axis=0)]); cn = np.vstack([z, ok.cumsum(axis=0)])
+    players = logs["player"].cat.categories.to_numpy(); teams = logs["team"].cat.categories.to_numpy(); tcodes = logs["team"].cat.codes.to_numpy()
+    hi = np.arange(1, len(X)+1); need = [cols.index(c) for c in ["pts40","reb40","ast40"]]
+    def last(w):
+        lo = np.maximum(hi-w, first); n = cn[hi]-cn[lo]
+        with np.errstate(divide="ignore", invalid="ignore"): r = np.where(n>=max(5,w//2), (cs[hi]-cs[lo])/n, np.nan)
+        idx = np.flatnonzero(~np.isnan(r[:, need]).any(axis=1)); idx = idx[np.r_[codes[idx][1:]!=codes[idx][:-1], True]] if idx.size else idx
+        if not idx.size: return pd.DataFrame()
+        out = pd.DataFrame(r[idx], columns=cols)
+        out["player"]=players[codes[idx]]; out["team"]=teams[tcodes[idx]]; out["date"]=logs["date"].values[idx]
+        out=out.fillna(0)
         for c in ["three_rate","ft_rate"]: 
             if c in out.columns: out[c]=out[c].clip(0,1.5)
-        return out.reset_index(drop=True)
-    return last(logs, win_short), last(logs, win_long)
+        return out
+    return last(win_short), last(win_long)
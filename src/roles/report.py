@@ -1,14 +1,18 @@
 # src/roles/report.py
 import numpy as np, pandas as pd
-from .smooth import stability
+from .smooth import stability_batch
 def make_report(df_off, feats_off, probs_off, labels_off, names_off,
                 df_def, feats_def, probs_def, labels_def, names_def):
-    rep = pd.DataFrame({"player": df_off["player"].values, "team": df_off["team"].values})
+    probs_off = np.ascontiguousarray(probs_off, dtype=np.float32); probs_def = np.ascontiguousarray(probs_def, dtype=np.float32)
+    names_off = np.asarray(names_off); names_def = np.asarray(names_def)
+    data = {"player": df_off["player"].values, "team": df_off["team"].values}
     ko = probs_off.shape[1]; kd = probs_def.shape[1]
-    for i in range(ko): rep[f"off_p{i}"] = probs_off[:,i]
-    for i in range(kd): rep[f"def_p{i}"] = probs_def[:,i]
-    rep["off_primary_idx"] = probs_off.argmax(axis=1); rep["off_primary_role"] = rep["off_primary_idx"].apply(lambda i: names_off[i])
-    rep["def_primary_idx"] = probs_def.argmax(axis=1); rep["def_primary_role"] = rep["def_primary_idx"].apply(lambda i: names_def[i])
-    rep["primary_role"] = rep["off_primary_role"]; rep["secondary_role"] = rep["def_primary_role"]
-    rep["stability"] = [stability(probs_off[i]) for i in range(len(rep))]
+    for i in range(ko): data[f"off_p{i}"] = probs_off[:,i]
+    for i in range(kd): data[f"def_p{i}"] = probs_def[:,i]
+    off_idx = probs_off.argmax(axis=1); def_idx = probs_def.argmax(axis=1)
+    data["off_primary_idx"] = off_idx; data["off_primary_role"] = names_off[off_idx]
+    data["def_primary_idx"] = def_idx; data["def_primary_role"] = names_def[def_idx]
+    data["primary_role"] = data["off_primary_role"]; data["secondary_role"] = data["def_primary_role"]
+    data["stability"] = stability_batch(probs_off)
+    rep = pd.DataFrame(data)
     return rep.sort_values(["team","player"]).reset_index(drop=True)
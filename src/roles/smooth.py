@@ -1,8 +1,18 @@
 # src/roles/smooth.py
 import numpy as np
-def ema_probs(prev, curr, alpha=0.6):
-    if prev is None or prev.shape!=curr.shape: return curr
-    return alpha*prev + (1-alpha)*curr
+from scipy.special import entr
+def ema_probs(prev, curr, alpha=0.6, out=None):
+    if prev is None or prev.shape!=curr.shape:
+        if out is None: return curr.copy()
+        out[...]=curr; return out
+    if out is None: out=np.empty(curr.shape, dtype=np.result_type(prev, curr))
+    elif np.shares_memory(out, curr): return np.add(alpha*prev, (1-alpha)*curr, out=out)
+    np.subtract(prev, curr, out=out); out*=alpha; out+=curr; return out
 def stability(p):
-    p=p.clip(1e-9,1.0); p=p/p.sum(); import numpy as np
-    H=-np.sum(p*np.log(p)); Hm=np.log(len(p)); return float(1-H/Hm) if Hm>0 else 1.0
+    s=p.sum()
+    if s<=0: return 1.0
+    Hm=np.log(len(p)); return float(1-entr(p/s).sum()/Hm) if Hm>0 else 1.0
+def stability_batch(P):
+    s=P.sum(axis=1, keepdims=True); Hm=np.log(P.shape[1])
+    if Hm<=0: return np.ones(len(P))
+    return np.where(s[:,0]>0, 1-entr(P/np.where(s>0,s,1)).sum(axis=1)/Hm, 1.0)